@@ -1,14 +1,20 @@
 import streamlit as st
 import joblib
+import io
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, PolynomialFeatures
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LinearRegression
+
+try:
+    from numba import njit
+except ImportError:
+    # Tanpa numba, fungsi yang sama dijalankan sebagai Python/NumPy biasa
+    def njit(*args, **kwargs):
+        return lambda func: func
 
 # Konfigurasi halaman
 st.set_page_config(page_title="Prediksi Harga Rumah Melbourne", layout="wide")
@@ -16,38 +22,227 @@ st.set_page_config(page_title="Prediksi Harga Rumah Melbourne", layout="wide")
 # Direktori model
 MODELS_DIR = './models'
 
-# Memuat model dan preprocessor
+# Nama model seperti yang tercatat di best_model_name.txt
+LINEAR_MODEL = 'Linear Regression'
+POLY_MODEL = 'Polynomial Regression (degree=2)'
+MODEL_NAMES = (LINEAR_MODEL, POLY_MODEL)
+
+# Pilihan dan label formulir prediksi
+PROPERTY_TYPE_LABELS = {"house": "Rumah", "unit": "Unit", "townhouse": "Townhouse"}
+
+# Wilayah Melbourne
+REGION_OPTIONS = ["Northern Metropolitan", "Southern Metropolitan", "Western Metropolitan", 
+                  "Eastern Metropolitan", "South-Eastern Metropolitan", "Eastern Victoria", 
+                  "Northern Victoria", "Western Victoria"]
+
+# Daerah dewan kota Melbourne
+COUNCIL_OPTIONS = ["Banyule", "Bayside", "Boroondara", "Brimbank", "Cardinia", 
+                   "Casey", "Darebin", "Frankston", "Glen Eira", "Greater Dandenong",
+                   "Hobsons Bay", "Hume", "Kingston", "Knox", "Macedon Ranges",
+                   "Manningham", "Maribyrnong", "Maroondah", "Melbourne", "Melton",
+                   "Monash", "Moonee Valley", "Moreland", "Mornington Peninsula",
+                   "Nillumbik", "Port Phillip", "Stonnington", "Whitehorse", "Whittlesea",
+                   "Yarra", "Yarra Ranges"]
+
+# Metode penjualan
+METHOD_LABELS = {"S": "Terjual", "SP": "Properti terjual sebelumnya", 
+                 "PI": "Properti tidak terjual", "VB": "Penawaran Penjual", 
+                 "SA": "Terjual Setelah Lelang"}
+
+# Memuat model dan preprocessor dari bundle yang dibuat oleh build_bundle.py
 @st.cache_resource
 def load_models():
     try:
-        linear_model = joblib.load(os.path.join(MODELS_DIR, 'linear_regression.joblib'))
-        poly_model = joblib.load(os.path.join(MODELS_DIR, 'polynomial_regression_(degree=2).joblib'))
-        preprocessor = joblib.load(os.path.join(MODELS_DIR, 'preprocessor.joblib'))
-        feature_info = joblib.load(os.path.join(MODELS_DIR, 'feature_info.joblib'))
+        # mmap_mode='r' membuat array model dibaca langsung dari page cache tanpa disalin
+        models_data = joblib.load(os.path.join(MODELS_DIR, 'models_bundle.joblib'), mmap_mode='r')
         
-        with open(os.path.join(MODELS_DIR, 'best_model_name.txt'), 'r') as f:
-            best_model_name = f.read().strip()
+        # Nama model terbaik yang tidak dikenal diperlakukan sebagai model polinomial
+        if models_data['best_model_name'] not in MODEL_NAMES:
+            models_data['best_model_name'] = POLY_MODEL
         
-        return {
-            'Linear Regression': linear_model,
-            'Polynomial Regression (degree=2)': poly_model,
-            'best_model_name': best_model_name,
-            'preprocessor': preprocessor,
-            'feature_info': feature_info
-        }
+        warm_up(models_data)
+        models_data['prediction_queue'] = start_batch_worker(models_data)
+        return models_data
     except Exception as e:
         st.error(f"Error saat memuat model: {str(e)}")
         return None
 
-# Fungsi untuk membuat prediksi
-def predict_price(model, input_data):
+# Baris input numerik dialokasikan sekali per thread lalu diisi ulang pada setiap prediksi
+SCRATCH = threading.local()
+
+def scratch_row(n_features):
+    row = getattr(SCRATCH, 'row', None)
+    if row is None or row.shape[1] != n_features:
+        row = SCRATCH.row = np.empty((1, n_features), dtype=np.float32)
+    return row
+
+# Transformasi StandardScaler + OneHotEncoder untuk satu baris dalam satu fungsi terkompilasi.
+# Posisi one-hot -1 berarti kategori tidak dikenal, sama seperti handle_unknown='ignore'.
+@njit(cache=True)
+def fused_transform(nums, mean, scale, cat_slots, out):
+    n_num = nums.shape[0]
+    for i in range(n_num):
+        out[i] = (nums[i] - mean[i]) / scale[i]
+    for i in range(n_num, out.shape[0]):
+        out[i] = 0.0
+    for j in range(cat_slots.shape[0]):
+        if cat_slots[j] >= 0:
+            out[cat_slots[j]] = 1.0
+
+# Fungsi untuk mengubah input menjadi vektor fitur (float32, satu baris).
+# Input formulir tidak pernah kosong, sehingga tahap imputer pada pipeline dapat dilewati.
+def transform_input(models_data, numeric_row, categorical_values):
     try:
-        prediction = model.predict(input_data)
-        return prediction[0]
+        # Satu pencarian dict per kolom langsung menghasilkan posisi one-hot pada vektor fitur
+        cat_slots = np.array([slots.get(categorical_values[col], -1) for col, slots in models_data['cat_slots'].items()],
+                             dtype=np.int64)
+        features = np.empty(models_data['n_features'], dtype=np.float32)
+        fused_transform(numeric_row[0], models_data['num_mean'], models_data['num_scale'], cat_slots, features)
+        return features
     except Exception as e:
-        st.error(f"Error saat membuat prediksi: {str(e)}")
+        st.error(f"Error saat memproses input: {str(e)}")
         return None
 
+# Fungsi untuk membuat prediksi dari matriks fitur (satu baris per permintaan), langsung
+# dengan koefisien float32 tanpa validasi input LinearRegression.predict
+def predict_price(coef, intercept, features):
+    return np.asarray(features, dtype=np.float32) @ coef + intercept
+
+# Fungsi untuk membuat prediksi regresi polinomial dari bentuk kuadrat yang telah digabung
+def predict_poly_price(quad, lin, intercept, features):
+    features = np.asarray(features, dtype=np.float32)
+    return ((features @ quad) * features).sum(axis=1) + features @ lin + intercept
+
+# Memilih fungsi prediksi berdasarkan nama model
+def predict_with_model(models_data, model_name, features):
+    if model_name == LINEAR_MODEL:
+        return predict_price(models_data['linear_coef'], models_data['linear_intercept'], features)
+    return predict_poly_price(models_data['poly_quad'], models_data['poly_lin'],
+                              models_data['poly_intercept'], features)
+
+# Menjalankan satu prediksi contoh saat model dimuat, agar kompilasi numba dan inisialisasi
+# BLAS tidak dibebankan pada prediksi pertama pengguna
+def warm_up(models_data):
+    row = scratch_row(len(models_data['num_idx']))
+    row[0] = models_data['num_mean']
+    features = transform_input(models_data, row, {col: next(iter(slots)) for col, slots in models_data['cat_slots'].items()})
+    for model_name in MODEL_NAMES:
+        predict_with_model(models_data, model_name, features[np.newaxis, :])
+
+# Permintaan prediksi dari semua sesi dikumpulkan oleh satu thread latar belakang,
+# lalu dihitung sekaligus sebagai satu batch
+BATCH_MAX_SIZE = 32
+BATCH_WINDOW = 0.005
+PREDICTION_TIMEOUT = 2.0
+
+def batch_worker(models_data, requests):
+    while True:
+        batch = [requests.get()]
+        deadline = time.monotonic() + BATCH_WINDOW
+        try:
+            while len(batch) < BATCH_MAX_SIZE:
+                batch.append(requests.get(timeout=max(deadline - time.monotonic(), 0)))
+        except queue.Empty:
+            pass
+        
+        try:
+            features = np.vstack([item[0] for item in batch])
+            results = [{} for _ in batch]
+            for model_name in MODEL_NAMES:
+                rows = [i for i, (_, model_names, _) in enumerate(batch) if model_name in model_names]
+                if rows:
+                    for i, pred in zip(rows, predict_with_model(models_data, model_name, features[rows])):
+                        results[i][model_name] = float(pred)
+            # Hasil diserahkan per permintaan, sehingga nama model yang salah pada satu
+            # permintaan tidak menggagalkan permintaan lain dalam batch yang sama
+            for (_, model_names, future), result in zip(batch, results):
+                unknown = [model_name for model_name in model_names if model_name not in result]
+                if unknown:
+                    future.set_exception(ValueError(f"Model tidak dikenal: {', '.join(unknown)}"))
+                else:
+                    future.set_result(tuple(result[model_name] for model_name in model_names))
+        except Exception as e:
+            # Future yang sudah selesai dilewati; set_exception akan gagal dan menghentikan thread
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+def start_batch_worker(models_data):
+    requests = queue.Queue()
+    threading.Thread(target=batch_worker, args=(models_data, requests), daemon=True).start()
+    return requests
+
+# Prediksi bersifat deterministik terhadap input, sehingga input yang sama cukup dihitung sekali
+@st.cache_data(max_entries=1024)
+def compute_predictions(rooms, distance, bedrooms, bathrooms, car_spaces, land_size, building_area,
+                        year_built, property_count, property_type, method, region, council, model_names):
+    models_data = load_models()
+    num_idx = models_data['num_idx']
+    
+    # Mengisi baris input numerik berdasarkan posisi kolom
+    row = scratch_row(len(num_idx))
+    row[0, num_idx['Rooms']] = rooms
+    row[0, num_idx['Distance']] = distance
+    row[0, num_idx['Bedroom2']] = bedrooms
+    row[0, num_idx['Bathroom']] = bathrooms
+    row[0, num_idx['Car']] = car_spaces
+    row[0, num_idx['Landsize']] = land_size
+    row[0, num_idx['BuildingArea']] = building_area
+    row[0, num_idx['YearBuilt']] = year_built
+    row[0, num_idx['Propertycount']] = property_count
+    
+    # Preprocessing dijalankan sekali, hasilnya dipakai oleh semua model yang diminta
+    features = transform_input(models_data, row, {
+        'Type': property_type,
+        'Method': method,
+        'Regionname': region,
+        'CouncilArea': council
+    })
+    if features is None:
+        return tuple(None for _ in model_names)
+    
+    # Mengirim vektor fitur ke thread batch dan menunggu hasilnya. Timeout atau kegagalan
+    # worker bersifat sementara, jadi exception dibiarkan keluar agar tidak ikut di-cache
+    future = Future()
+    models_data['prediction_queue'].put((features, model_names, future))
+    return future.result(timeout=PREDICTION_TIMEOUT)
+
+# Data kepentingan fitur (tetap) yang ditampilkan di tab Informasi Model
+FEATURE_IMPORTANCE = {
+    'Ruangan': 0.65,
+    'Kamar Mandi': 0.58,
+    'Luas Bangunan': 0.52,
+    'Jarak': -0.48,
+    'Dewan_Stonnington': 0.45,
+    'Tipe_rumah': 0.40,
+    'Kamar Tidur': 0.38,
+    'Tahun Dibangun': 0.25
+}
+
+# Grafik kepentingan fitur berisi data tetap, jadi cukup dirender sekali menjadi PNG
+@st.cache_resource
+def feature_importance_chart():
+    # matplotlib hanya diimpor saat grafik pertama kali dirender
+    import matplotlib.pyplot as plt
+    
+    fig, ax = plt.subplots(figsize=(10, 7))
+    features = list(FEATURE_IMPORTANCE)
+    importance = list(FEATURE_IMPORTANCE.values())
+    colors = ['darkgreen' if x > 0 else 'darkred' for x in importance]
+    
+    y_pos = np.arange(len(features))
+    ax.barh(y_pos, importance, color=colors)
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(features)
+    ax.set_xlabel('Dampak pada Harga')
+    ax.set_title('Kepentingan Fitur (Regresi Linear)')
+    ax.axvline(x=0, color='black', linestyle='-', alpha=0.5)
+    
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=90)
+    plt.close(fig)
+    return buf.getvalue()
+
 # Aplikasi Utama
 def main():
     # Judul dan deskripsi aplikasi
@@ -76,11 +271,12 @@ def main():
     with tab1:
         st.header("Detail Properti")
         
-        # Membuat layout dua kolom
-        col1, col2 = st.columns(2)
-        
         # Formulir untuk input pengguna
         with st.form("prediction_form"):
+            # Membuat layout dua kolom di dalam formulir, agar perubahan input tidak
+            # menjalankan ulang skrip sebelum tombol submit ditekan
+            col1, col2 = st.columns(2)
+            
             # Input numerik di kolom pertama
             with col1:
                 st.subheader("Karakteristik Properti")
@@ -96,102 +292,79 @@ def main():
             with col2:
                 st.subheader("Lokasi & Tipe")
                 distance = st.slider("Jarak dari CBD (km)", 0.0, 40.0, 10.0, 0.5)
-                property_type = st.selectbox("Tipe Properti", ["house", "unit", "townhouse"], 
-                                           format_func=lambda x: {"house": "Rumah", "unit": "Unit", "townhouse": "Townhouse"}[x])
+                property_type = st.selectbox("Tipe Properti", list(PROPERTY_TYPE_LABELS),
+                                           format_func=PROPERTY_TYPE_LABELS.get)
                 
                 # Wilayah Melbourne
-                region_options = ["Northern Metropolitan", "Southern Metropolitan", "Western Metropolitan", 
-                                 "Eastern Metropolitan", "South-Eastern Metropolitan", "Eastern Victoria", 
-                                 "Northern Victoria", "Western Victoria"]
-                region = st.selectbox("Wilayah", region_options)
+                region = st.selectbox("Wilayah", REGION_OPTIONS)
                 
                 # Daerah dewan kota Melbourne
-                council_options = ["Banyule", "Bayside", "Boroondara", "Brimbank", "Cardinia", 
-                                  "Casey", "Darebin", "Frankston", "Glen Eira", "Greater Dandenong",
-                                  "Hobsons Bay", "Hume", "Kingston", "Knox", "Macedon Ranges",
-                                  "Manningham", "Maribyrnong", "Maroondah", "Melbourne", "Melton",
-                                  "Monash", "Moonee Valley", "Moreland", "Mornington Peninsula",
-                                  "Nillumbik", "Port Phillip", "Stonnington", "Whitehorse", "Whittlesea",
-                                  "Yarra", "Yarra Ranges"]
-                council = st.selectbox("Daerah Dewan Kota", council_options)
+                council = st.selectbox("Daerah Dewan Kota", COUNCIL_OPTIONS)
                 
                 # Metode penjualan
-                method_options = ["S", "SP", "PI", "VB", "SA"]
-                method = st.selectbox("Metode Penjualan", method_options, 
-                                    format_func=lambda x: {"S": "Terjual", "SP": "Properti terjual sebelumnya", 
-                                                         "PI": "Properti tidak terjual", "VB": "Penawaran Penjual", 
-                                                         "SA": "Terjual Setelah Lelang"}[x] if x in ["S", "SP", "PI", "VB", "SA"] else x)
+                method = st.selectbox("Metode Penjualan", list(METHOD_LABELS),
+                                    format_func=METHOD_LABELS.get)
                 
                 # Untuk demonstrasi, jumlah properti di daerah ditentukan manual
                 property_count = st.slider("Jumlah properti di daerah", 100, 10000, 5000, 100)
             
+            # Model polinomial hanya dihitung bila perbandingan diminta
+            show_both = st.checkbox("Bandingkan kedua model", value=False)
+            
             # Tombol submit untuk prediksi
             submit_button = st.form_submit_button("Prediksi Harga")
         
         # Proses prediksi saat formulir dikirim
         if submit_button:
-            # Membuat dataframe input
-            input_data = pd.DataFrame({
-                'Rooms': [rooms],
-                'Distance': [distance],
-                'Bedroom2': [bedrooms],
-                'Bathroom': [bathrooms],
-                'Car': [car_spaces],
-                'Landsize': [land_size],
-                'BuildingArea': [building_area],
-                'YearBuilt': [year_built],
-                'Propertycount': [property_count],
-                'Type': [property_type],
-                'Method': [method],
-                'Regionname': [region],
-                'CouncilArea': [council]
-            })
-            
             # Menampilkan spinner saat membuat prediksi
             with st.spinner('Menghitung harga...'):
-                # Membuat prediksi dengan kedua model
-                linear_pred = predict_price(models_data['Linear Regression'], input_data)
-                poly_pred = predict_price(models_data['Polynomial Regression (degree=2)'], input_data)
-                
                 # Menentukan model terbaik
                 best_model = models_data['best_model_name']
-                best_pred = linear_pred if best_model == 'Linear Regression' else poly_pred
+                model_names = MODEL_NAMES if show_both else (best_model,)
+                
+                # Membuat prediksi dengan model yang diminta (input yang sama diambil dari cache)
+                try:
+                    predictions = compute_predictions(
+                        rooms, distance, bedrooms, bathrooms, car_spaces, land_size, building_area,
+                        year_built, property_count, property_type, method, region, council, model_names
+                    )
+                except FutureTimeoutError:
+                    st.error("Error saat membuat prediksi: waktu tunggu habis, silakan coba lagi.")
+                    return
+                except Exception as e:
+                    st.error(f"Error saat membuat prediksi: {str(e)}")
+                    return
+                if any(pred is None for pred in predictions):
+                    return
+                predictions = dict(zip(model_names, predictions))
+                best_pred = predictions[best_model]
                 
                 # Menampilkan hasil
                 st.success("Prediksi Selesai!")
                 
-                # Membuat kolom untuk menampilkan prediksi
-                res_col1, res_col2, res_col3 = st.columns([1, 1, 1])
-                
-                with res_col1:
-                    st.metric("Prediksi Regresi Linear", f"${int(linear_pred):,}")
-                
-                with res_col2:
-                    st.metric("Prediksi Regresi Polinomial", f"${int(poly_pred):,}")
-                
-                with res_col3:
+                if show_both:
+                    linear_pred = predictions[LINEAR_MODEL]
+                    poly_pred = predictions[POLY_MODEL]
+                    
+                    # Membuat kolom untuk menampilkan prediksi
+                    res_col1, res_col2, res_col3 = st.columns([1, 1, 1])
+                    
+                    with res_col1:
+                        st.metric("Prediksi Regresi Linear", f"${int(linear_pred):,}")
+                    
+                    with res_col2:
+                        st.metric("Prediksi Regresi Polinomial", f"${int(poly_pred):,}")
+                    
+                    with res_col3:
+                        st.metric(f"Prediksi Model Terbaik ({best_model})", f"${int(best_pred):,}")
+                    
+                    # Membuat grafik batang untuk membandingkan prediksi (dirender di browser)
+                    models_list = ['Regresi Linear', 'Regresi Polinomial']
+                    prices = [linear_pred, poly_pred]
+                    st.bar_chart(pd.DataFrame({'Harga Prediksi (AUD $)': prices}, index=models_list))
+                else:
                     st.metric(f"Prediksi Model Terbaik ({best_model})", f"${int(best_pred):,}")
                 
-                # Membuat grafik batang untuk membandingkan prediksi
-                fig, ax = plt.subplots(figsize=(10, 6))
-                models_list = ['Regresi Linear', 'Regresi Polinomial']
-                prices = [linear_pred, poly_pred]
-                colors = ['steelblue', 'darkorange']
-                
-                bars = ax.bar(models_list, prices, color=colors)
-                ax.set_ylabel('Harga Prediksi (AUD $)')
-                ax.set_title('Perbandingan Prediksi Model')
-                
-                # Menambahkan label harga di atas batang
-                for bar in bars:
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height + 5000,
-                           f'${int(height):,}',
-                           ha='center', va='bottom', fontsize=11)
-                
-                plt.tight_layout()
-                st.pyplot(fig)
-                
                 # Menambahkan disclaimer
                 st.info("Disclaimer: Prediksi ini berdasarkan data historis dan hanya untuk tujuan informasi. Harga properti dipengaruhi oleh banyak faktor yang tidak tercakup dalam model ini.")
     
@@ -227,21 +400,8 @@ def main():
         - **Tipe Properti**: Rumah biasanya lebih mahal daripada unit atau townhouse
         """)
         
-        # Membuat grafik kepentingan fitur untuk visualisasi
-        fig, ax = plt.subplots(figsize=(10, 7))
-        features = ['Ruangan', 'Kamar Mandi', 'Luas Bangunan', 'Jarak', 'Dewan_Stonnington', 'Tipe_rumah', 'Kamar Tidur', 'Tahun Dibangun']
-        importance = [0.65, 0.58, 0.52, -0.48, 0.45, 0.40, 0.38, 0.25]
-        colors = ['darkgreen' if x > 0 else 'darkred' for x in importance]
-        
-        y_pos = np.arange(len(features))
-        ax.barh(y_pos, importance, color=colors)
-        ax.set_yticks(y_pos)
-        ax.set_yticklabels(features)
-        ax.set_xlabel('Dampak pada Harga')
-        ax.set_title('Kepentingan Fitur (Regresi Linear)')
-        ax.axvline(x=0, color='black', linestyle='-', alpha=0.5)
-        
-        st.pyplot(fig)
+        # Menampilkan grafik kepentingan fitur yang sudah dirender
+        st.image(feature_importance_chart())
         
         st.subheader("Performa Model")
         st.markdown("""
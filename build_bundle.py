@@ -0,0 +1,91 @@
+import joblib
+import os
+import numpy as np
+
+# Direktori model
+MODELS_DIR = './models'
+BUNDLE_PATH = os.path.join(MODELS_DIR, 'models_bundle.joblib')
+
+# Menggabungkan PolynomialFeatures(degree=2) dan koefisien regresi menjadi bentuk kuadrat
+# x^T A x + b^T x, sehingga baris fitur yang diperluas tidak perlu dibuat saat prediksi
+def fuse_polynomial(poly_features, coef):
+    n_features = poly_features.n_features_in_
+    quad = np.zeros((n_features, n_features))
+    lin = np.zeros(n_features)
+
+    for powers, weight in zip(poly_features.powers_, coef):
+        idx = np.flatnonzero(powers)
+        if powers.sum() == 1:
+            lin[idx[0]] += weight
+        elif len(idx) == 1:
+            quad[idx[0], idx[0]] += weight
+        else:
+            # Suku interaksi x_i*x_j dibagi rata ke A[i, j] dan A[j, i]
+            quad[idx[0], idx[1]] += weight / 2
+            quad[idx[1], idx[0]] += weight / 2
+
+    return np.ascontiguousarray(quad, dtype=np.float32), np.ascontiguousarray(lin, dtype=np.float32)
+
+# Memastikan bundle hanya berisi array NumPy dan tipe bawaan Python, sehingga app.py
+# tidak perlu membangun ulang objek sklearn (dan mengimpor sklearn) saat memuat model
+def check_plain_artifacts(value, path='bundle'):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            check_plain_artifacts(item, f"{path}[{key!r}]")
+    elif isinstance(value, (list, tuple)):
+        for i, item in enumerate(value):
+            check_plain_artifacts(item, f"{path}[{i}]")
+    elif not isinstance(value, (str, int, float, np.ndarray, np.generic)):
+        raise TypeError(f"{path} berisi objek {type(value).__module__}.{type(value).__name__}")
+
+# Menggabungkan semua artefak model menjadi satu file yang dimuat oleh app.py
+def build_bundle():
+    linear_model = joblib.load(os.path.join(MODELS_DIR, 'linear_regression.joblib'))
+    poly_model = joblib.load(os.path.join(MODELS_DIR, 'polynomial_regression_(degree=2).joblib'))
+    preprocessor = joblib.load(os.path.join(MODELS_DIR, 'preprocessor.joblib'))
+    feature_info = joblib.load(os.path.join(MODELS_DIR, 'feature_info.joblib'))
+
+    with open(os.path.join(MODELS_DIR, 'best_model_name.txt'), 'r') as f:
+        best_model_name = f.read().strip()
+
+    # Mengambil tahap-tahap pipeline agar preprocessing cukup dijalankan sekali per prediksi
+    linear_regressor = linear_model.named_steps['regressor']
+    poly_regressor = poly_model.named_steps['regressor']
+    poly_quad, poly_lin = fuse_polynomial(poly_model.named_steps['poly'], poly_regressor.coef_)
+
+    # Parameter StandardScaler dan posisi tiap kolom numerik pada baris input
+    numerical_cols = feature_info['numerical_cols_used']
+    scaler = preprocessor.named_transformers_['num'].named_steps['scaler']
+    num_idx = {col: i for i, col in enumerate(numerical_cols)}
+
+    # Posisi akhir (indeks pada vektor fitur) tiap kategori yang dipelajari OneHotEncoder:
+    # jumlah kolom numerik + posisi awal blok one-hot kolom tersebut + kode kategori
+    onehot = preprocessor.named_transformers_['cat'].named_steps['onehot']
+    cat_sizes = [len(cats) for cats in onehot.categories_]
+    cat_offsets = len(numerical_cols) + np.concatenate([[0], np.cumsum(cat_sizes)[:-1]])
+    cat_slots = {
+        col: {value: int(offset) + code for code, value in enumerate(cats)}
+        for col, cats, offset in zip(feature_info['categorical_cols_used'], onehot.categories_, cat_offsets)
+    }
+
+    return {
+        'best_model_name': best_model_name,
+        'feature_info': feature_info,
+        'num_idx': num_idx,
+        'num_mean': np.ascontiguousarray(scaler.mean_, dtype=np.float32),
+        'num_scale': np.ascontiguousarray(scaler.scale_, dtype=np.float32),
+        'cat_slots': cat_slots,
+        'n_features': len(numerical_cols) + sum(cat_sizes),
+        'linear_coef': np.ascontiguousarray(linear_regressor.coef_, dtype=np.float32),
+        'linear_intercept': np.float32(linear_regressor.intercept_),
+        'poly_quad': poly_quad,
+        'poly_lin': poly_lin,
+        'poly_intercept': np.float32(poly_regressor.intercept_)
+    }
+
+if __name__ == "__main__":
+    # compress=0 agar array di dalam bundle dapat dimuat dengan mmap_mode='r'
+    bundle = build_bundle()
+    check_plain_artifacts(bundle)
+    joblib.dump(bundle, BUNDLE_PATH, compress=0)
+    print(f"Bundle model disimpan di {BUNDLE_PATH}")